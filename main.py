@@ -3,15 +3,21 @@
 
 import os
 import re
+import sys
+import csv
 import json
 import time
 import logging
+import threading
+from itertools import islice
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import unquote_plus
 
 import httpx
 from selectolax.parser import HTMLParser
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, wait_exponential, wait_random, retry_if_exception
 
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
@@ -39,8 +45,21 @@ TARGET_COUNTIES = [
 ]
 
 POLITE_DELAY_SECONDS = 1.5
+MAX_CONCURRENT_COUNTIES = 4
+MAX_CONCURRENT_DETAILS = 4  # per county, so at most 16 requests in flight overall
 MAX_RETRIES = 3
 HTTP_TIMEOUT = 30.0
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; foreclosure-scraper/1.0)",
+    "Accept": "text/html,application/xhtml+xml",
+}
+
+# Optional per-county scrape checkpoints so a failed run can be resumed without re-scraping
+CHECKPOINT_DIR = os.environ.get("CHECKPOINT_DIR", "")
+CHECKPOINT_TTL_SECONDS = 6 * 3600
+
+# Optional directory for a dated CSV copy of each run's 30-day rows (for downstream use)
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "")
 
 # -----------------------------
 # Logging
@@ -67,12 +86,34 @@ except Exception:
 def now_et():
     return datetime.now(ET_TZ)
 
-def today_et():
-    return now_et().date()
+def snapshot_label(ts):
+    return f"Snapshot for {ts.strftime('%A - %Y-%m-%d %H:%M %Z')}"
+
+# Fast path for the formats the listing actually uses:
+# "9/17/2025", "9/17/2025 1:00 PM", "9/17/2025 1:00PM", "9/17/2025 13:00"
+_SALE_DATE_RE = re.compile(
+    r"(\d{1,2})/(\d{1,2})/(\d{4})(?:\s+(\d{1,2}):(\d{2})(?:\s*([AaPp][Mm]))?)?"
+)
 
 def parse_sale_date(date_str: str):
     if not date_str:
         return None
+    s = date_str.strip()
+    m = _SALE_DATE_RE.fullmatch(s)
+    if m:
+        mo, d, y, hh, mi, ampm = m.groups()
+        hour = int(hh) if hh else 0
+        if ampm:
+            if not 1 <= hour <= 12:
+                return None
+            hour = hour % 12 + (12 if ampm.upper() == "PM" else 0)
+        try:
+            return datetime(int(y), int(mo), int(d), hour, int(mi) if mi else 0)
+        except ValueError:
+            return None
+    # Rare fallback for anything the regex doesn't cover
+    if "/" not in s:
+        return None
     for fmt in (
         "%m/%d/%Y %I:%M %p",
         "%m/%d/%Y %H:%M",
@@ -80,11 +121,69 @@ def parse_sale_date(date_str: str):
         "%m/%d/%Y %I:%M%p"   # e.g. "9/17/2025 1:00PM" (no space before AM/PM)
     ):
         try:
-            return datetime.strptime(date_str.strip(), fmt)
+            return datetime.strptime(s, fmt)
         except ValueError:
             continue
     return None
 
+# -----------------------------
+# Checkpoints
+# -----------------------------
+def _checkpoint_path(county):
+    return os.path.join(CHECKPOINT_DIR, f"county_{county['county_id']}.json")
+
+def load_county_checkpoint(county):
+    if not CHECKPOINT_DIR:
+        return None
+    path = _checkpoint_path(county)
+    try:
+        if time.time() - os.path.getmtime(path) > CHECKPOINT_TTL_SECONDS:
+            return None
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+def save_county_checkpoint(county, rows):
+    if not CHECKPOINT_DIR:
+        return
+    path = _checkpoint_path(county)
+    tmp = path + ".tmp"
+    try:
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(rows, fh)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Could not write checkpoint for {county['county_name']}: {e}")
+
+def clear_county_checkpoints():
+    # Checkpoints only exist to resume a failed run; once the sheets are written they'd
+    # just replay stale rows into a re-run
+    if not CHECKPOINT_DIR:
+        return
+    for county in TARGET_COUNTIES:
+        try:
+            os.remove(_checkpoint_path(county))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove checkpoint for {county['county_name']}: {e}")
+
+def export_snapshot_csv(header, rows, run_date):
+    if not SNAPSHOT_DIR:
+        return
+    path = os.path.join(SNAPSHOT_DIR, f"{run_date:%Y%m%d}.csv")
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(header)
+            writer.writerows(rows)
+        logger.info(f"Exported {len(rows)} rows to {path}")
+    except OSError as e:
+        logger.warning(f"Could not export snapshot CSV: {e}")
+
 # -----------------------------
 # Credentials
 # -----------------------------
@@ -126,20 +225,26 @@ class SheetsClient:
     def __init__(self, spreadsheet_id: str, service):
         self.spreadsheet_id = spreadsheet_id
         self.svc = service.spreadsheets()
+        # Spreadsheet metadata is fetched once and reused; new tabs are added to it in place
+        self._info_cache = None
+        # Formatting requests are queued and sent together by flush_pending()
+        self._pending_requests = []
 
     def spreadsheet_info(self):
+        if self._info_cache is not None:
+            return self._info_cache
         try:
             info = self.svc.get(spreadsheetId=self.spreadsheet_id).execute()
             title = info.get("properties", {}).get("title", "")
             logger.info(f"Connected to spreadsheet: {title}")
+            self._info_cache = info
             return info
         except HttpError as e:
             logger.error(f"Failed to open spreadsheet: {e}")
             raise
 
     def _get_sheet_id(self, sheet_name: str):
-        info = self.spreadsheet_info()
-        for s in info.get("sheets", []):
+        for s in self.spreadsheet_info().get("sheets", []):
             if s["properties"]["title"] == sheet_name:
                 return s["properties"]["sheetId"]
         return None
@@ -147,58 +252,76 @@ class SheetsClient:
     def sheet_exists(self, sheet_name: str):
         return self._get_sheet_id(sheet_name) is not None
 
-    def create_sheet_if_missing(self, sheet_name: str):
-        if self.sheet_exists(sheet_name):
+    def create_sheets_if_missing(self, sheet_names):
+        # All missing tabs are added in one batchUpdate
+        missing = [n for n in dict.fromkeys(sheet_names) if not self.sheet_exists(n)]
+        if not missing:
             return
         try:
-            self.svc.batchUpdate(
+            res = self.svc.batchUpdate(
                 spreadsheetId=self.spreadsheet_id,
-                body={"requests": [{"addSheet": {"properties": {"title": sheet_name}}}]},
+                body={"requests": [{"addSheet": {"properties": {"title": n}}} for n in missing]},
             ).execute()
-            logger.info(f"Created sheet: {sheet_name}")
+            # The replies carry the new sheetIds, so record them rather than refetching metadata
+            cached = self.spreadsheet_info().setdefault("sheets", [])
+            for reply in res.get("replies", []):
+                cached.append({"properties": reply["addSheet"]["properties"]})
+            logger.info(f"Created sheets: {', '.join(missing)}")
         except HttpError as e:
-            logger.error(f"Error creating sheet {sheet_name}: {e}")
+            logger.error(f"Error creating sheets {', '.join(missing)}: {e}")
             raise
 
-    def get_values(self, sheet_name: str, rng: str = "A:Z"):
+    def batch_get_values(self, ranges_by_sheet: dict):
+        # One values.batchGet for several sheets (sheet name -> range); returns sheet name -> values
+        sheet_names = list(ranges_by_sheet)
+        if not sheet_names:
+            return {}
         try:
-            res = self.svc.values().get(
+            res = self.svc.values().batchGet(
                 spreadsheetId=self.spreadsheet_id,
-                range=f"'{sheet_name}'!{rng}"
+                ranges=[f"'{name}'!{rng}" for name, rng in ranges_by_sheet.items()],
             ).execute()
-            return res.get("values", [])
         except HttpError as e:
-            logger.error(f"Error reading range {sheet_name}!{rng}: {e}")
-            return []
-
-    def clear(self, sheet_name: str, rng: str = "A:Z"):
+            # Never fall back to empty values: the diff would mark every row New and
+            # All Data would be treated as a first run and overwritten
+            logger.error(f"Error batch-reading {len(sheet_names)} sheets: {e}")
+            raise
+        # valueRanges come back in request order
+        value_ranges = res.get("valueRanges", [])
+        return {name: vr.get("values", []) for name, vr in zip(sheet_names, value_ranges)}
+
+    def batch_clear(self, ranges):
+        # One values.batchClear for several (sheet name, range) pairs
+        ranges = list(ranges)
+        if not ranges:
+            return
         try:
-            self.svc.values().clear(
+            self.svc.values().batchClear(
                 spreadsheetId=self.spreadsheet_id,
-                range=f"'{sheet_name}'!{rng}"
+                body={"ranges": [f"'{name}'!{rng}" for name, rng in ranges]},
             ).execute()
         except HttpError as e:
-            logger.error(f"Error clearing range {sheet_name}!{rng}: {e}")
+            logger.error(f"Error clearing {len(ranges)} ranges: {e}")
             raise
 
-    def write_values(self, sheet_name: str, values, start_cell: str = "A1"):
-        if not values:
+    def format_sheets(self, specs: dict):
+        # specs: sheet name -> (num_columns, data_rows); requests are queued until flush_pending()
+        for sheet_name, (num_columns, data_rows) in specs.items():
+            sheet_id = self._get_sheet_id(sheet_name)
+            if sheet_id is not None:
+                self._pending_requests += self._format_requests(sheet_id, num_columns, data_rows)
+
+    def flush_pending(self):
+        # Send every queued formatting request in a single batchUpdate
+        if not self._pending_requests:
             return
+        requests, self._pending_requests = self._pending_requests, []
         try:
-            self.svc.values().update(
-                spreadsheetId=self.spreadsheet_id,
-                range=f"'{sheet_name}'!{start_cell}",
-                valueInputOption="USER_ENTERED",
-                body={"values": values},
-            ).execute()
+            self.svc.batchUpdate(spreadsheetId=self.spreadsheet_id, body={"requests": requests}).execute()
         except HttpError as e:
-            logger.error(f"Error writing to {sheet_name}!{start_cell}: {e}")
-            raise
+            logger.warning(f"Could not apply {len(requests)} formatting requests: {e}")
 
-    def format_sheet(self, sheet_name: str, num_columns: int):
-        sheet_id = self._get_sheet_id(sheet_name)
-        if sheet_id is None:
-            return
+    def _format_requests(self, sheet_id, num_columns: int, data_rows: int = 0):
         requests = [
             # Snapshot row (row 1)
             {
@@ -257,10 +380,23 @@ class SheetsClient:
                 }
             },
         ]
-        try:
-            self.svc.batchUpdate(spreadsheetId=self.spreadsheet_id, body={"requests": requests}).execute()
-        except HttpError as e:
-            logger.warning(f"Could not format sheet {sheet_name}: {e}")
+        if data_rows:
+            # Rows inserted at the top inherit the old snapshot row's style; reset only the
+            # fields that style sets, so number/date formats from USER_ENTERED parsing survive
+            requests.append({
+                "repeatCell": {
+                    "range": {
+                        "sheetId": sheet_id,
+                        "startRowIndex": 2,
+                        "endRowIndex": 2 + data_rows,
+                        "startColumnIndex": 0,
+                        "endColumnIndex": num_columns
+                    },
+                    "cell": {"userEnteredFormat": {}},
+                    "fields": "userEnteredFormat(backgroundColor,textFormat)"
+                }
+            })
+        return requests
 
     def detect_header_row_index(self, values):
         # If first row is "Snapshot for ..." then header is row 1
@@ -276,25 +412,69 @@ class SheetsClient:
         # Fallback to the very top
         return 0
 
-    def prepend_snapshot(self, sheet_name: str, header_row, new_rows):
+    def build_prepend_payload(self, header_row, new_rows, label):
         # Always prepend a new snapshot row + header, even if new_rows is empty
-        existing = self.get_values(sheet_name, "A:Z")
-        prefix = [[f"Snapshot for {now_et().strftime('%A - %Y-%m-%d %H:%M %Z')}"]]
-        payload = prefix + [header_row] + (new_rows if new_rows else [])
-        if existing:
-            payload += existing
-        self.clear(sheet_name, "A:Z")
-        self.write_values(sheet_name, payload, "A1")
-        self.format_sheet(sheet_name, len(header_row))
-        logger.info(f"Prepended snapshot to '{sheet_name}' with {len(new_rows) if new_rows else 0} new rows")
-
-    def overwrite_with_snapshot(self, sheet_name: str, header_row, all_rows):
-        snap = [[f"Snapshot for {now_et().strftime('%A - %Y-%m-%d %H:%M %Z')}"]]
-        payload = snap + [header_row] + all_rows
-        self.clear(sheet_name, "A:Z")
-        self.write_values(sheet_name, payload, "A1")
-        self.format_sheet(sheet_name, len(header_row))
-        logger.info(f"Wrote full snapshot to '{sheet_name}' with {len(all_rows)} rows")
+        prefix = [[label]]
+        return prefix + [header_row] + (new_rows if new_rows else [])
+
+    def insert_top_rows(self, rows_by_sheet: dict):
+        # Make room above the existing history with insertDimension, so only the new
+        # snapshot block has to be uploaded; old rows (and their formatting) shift down
+        requests = []
+        for name, n in rows_by_sheet.items():
+            sheet_id = self._get_sheet_id(name)
+            if sheet_id is None or n <= 0:
+                continue
+            requests.append({
+                "insertDimension": {
+                    "range": {"sheetId": sheet_id, "dimension": "ROWS", "startIndex": 0, "endIndex": n},
+                    "inheritFromBefore": False
+                }
+            })
+        if not requests:
+            return
+        try:
+            self.svc.batchUpdate(spreadsheetId=self.spreadsheet_id, body={"requests": requests}).execute()
+        except HttpError as e:
+            logger.error(f"Error inserting rows into {len(requests)} sheets: {e}")
+            raise
+
+    def remove_top_rows(self, rows_by_sheet: dict):
+        # Undo insert_top_rows when the write that should fill those rows failed
+        requests = []
+        for name, n in rows_by_sheet.items():
+            sheet_id = self._get_sheet_id(name)
+            if sheet_id is None or n <= 0:
+                continue
+            requests.append({
+                "deleteDimension": {
+                    "range": {"sheetId": sheet_id, "dimension": "ROWS", "startIndex": 0, "endIndex": n}
+                }
+            })
+        if not requests:
+            return
+        try:
+            self.svc.batchUpdate(spreadsheetId=self.spreadsheet_id, body={"requests": requests}).execute()
+        except HttpError as e:
+            logger.error(f"Error removing inserted rows from {len(requests)} sheets: {e}")
+            raise
+
+    def batch_write_values(self, values_by_sheet: dict, start_cell: str = "A1"):
+        # One values.batchUpdate for several sheets instead of one update per sheet
+        if not values_by_sheet:
+            return
+        data = [
+            {"range": f"'{name}'!{start_cell}", "values": values}
+            for name, values in values_by_sheet.items()
+        ]
+        try:
+            self.svc.values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={"valueInputOption": "USER_ENTERED", "data": data},
+            ).execute()
+        except HttpError as e:
+            logger.error(f"Error batch-writing {len(data)} sheets: {e}")
+            raise
 
 # -----------------------------
 # Scrape helpers
@@ -302,43 +482,60 @@ class SheetsClient:
 def norm_text(s: str) -> str:
     if not s:
         return ""
-    return " ".join(s.split()).strip()
+    # split()/join collapses and trims whitespace in one pass, faster than re.sub(r"\s+")
+    return " ".join(s.split())
+
+_PID_RE = re.compile(r"[?&]PropertyId=([^&#]+)")
 
 def extract_property_id_from_href(href: str) -> str:
-    try:
-        q = parse_qs(urlparse(href).query)
-        return q.get("PropertyId", [""])[0]
-    except Exception:
-        return ""
+    # Runs once per listing row; a regex avoids urlparse/parse_qs building dicts and lists
+    m = _PID_RE.search(href) if href else None
+    return unquote_plus(m.group(1)) if m else ""
 
-def extract_approx_judgment(html_content: str, county_id: str) -> str:
-    tree = HTMLParser(html_content)
-    text_content = tree.text()
-    patterns = [
+# Detail-page patterns, compiled once (these run for every property)
+_JUDGMENT_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
         r'Approx(?:imate|\.)?\s*Judgment[^$]*\$(\d[\d,]*)',
         r'Judgment Amount[^$]*\$(\d[\d,]*)',
         r'Approx(?:imate|\.)?\s*Upset[^$]*\$(\d[\d,]*)',
         r'Upset Price[^$]*\$(\d[\d,]*)',
         r'Debt Amount[^$]*\$(\d[\d,]*)',
-    ]
-    if county_id == "24":
-        patterns = [r'Upset[^$]*\$(\d[\d,]*)', r'Amount Due[^$]*\$(\d[\d,]*)'] + patterns
+    )
+]
+_NEW_CASTLE_JUDGMENT_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
+        r'Upset[^$]*\$(\d[\d,]*)',
+        r'Amount Due[^$]*\$(\d[\d,]*)',
+    )
+] + _JUDGMENT_PATTERNS
+_ANY_MONEY_RE = re.compile(r"\$(\d[\d,]{3,})")
+_SALE_TYPE_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
+        r"Sale Type\s*:\s*([^\n\r]+)",
+        r"Type of Sale\s*:\s*([^\n\r]+)",
+    )
+]
+
+# Both extractors take the page's plain text so the details HTML is parsed only once
+def extract_approx_judgment(text_content: str, county_id: str) -> str:
+    # Every pattern needs a dollar amount, so pages without one can skip the scans
+    if "$" not in text_content:
+        return ""
+    patterns = _NEW_CASTLE_JUDGMENT_PATTERNS if county_id == "24" else _JUDGMENT_PATTERNS
     for p in patterns:
-        m = re.search(p, text_content, re.IGNORECASE)
+        m = p.search(text_content)
         if m:
             return f"${m.group(1)}"
-    any_money = re.findall(r"\$(\d[\d,]{3,})", text_content)
-    if any_money:
-        return f"${any_money[0]}"
+    m = _ANY_MONEY_RE.search(text_content)
+    if m:
+        return f"${m.group(1)}"
     return ""
 
-def extract_sale_type(html_content: str, county_id: str) -> str:
+def extract_sale_type(text: str, county_id: str) -> str:
     if county_id != "24":
         return ""
-    tree = HTMLParser(html_content)
-    text = tree.text()
-    for p in [r"Sale Type\s*:\s*([^\n\r]+)", r"Type of Sale\s*:\s*([^\n\r]+)"]:
-        m = re.search(p, text, re.IGNORECASE)
+    for p in _SALE_TYPE_PATTERNS:
+        m = p.search(text)
         if m:
             return norm_text(m.group(1))
     return "Unknown"
@@ -346,15 +543,55 @@ def extract_sale_type(html_content: str, county_id: str) -> str:
 # -----------------------------
 # HTTP scraper
 # -----------------------------
+def _is_retryable(exc: BaseException) -> bool:
+    # Network errors, throttling and server errors are worth retrying; other 4xx won't change
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(exc, httpx.RequestError)
+
+# Shared by every request; the random jitter keeps concurrent counties from retrying in lockstep
+http_retry = retry(
+    stop=stop_after_attempt(MAX_RETRIES),
+    wait=wait_exponential(multiplier=1, min=2, max=8) + wait_random(0, 1),
+    retry=retry_if_exception(_is_retryable),
+)
+
 class ForeclosureScraper:
     def __init__(self):
-        pass
+        # One client per worker thread: connections are reused across the counties a
+        # worker handles, while concurrent searches don't share session cookies
+        # (scrape_county also clears cookies so consecutive searches start fresh)
+        self._local = threading.local()
+        self._clients = []
+        self._clients_lock = threading.Lock()
+
+    def _client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = httpx.Client(
+                follow_redirects=True,
+                timeout=HTTP_TIMEOUT,
+                headers=HTTP_HEADERS,
+                # Enough kept-alive connections for this county's concurrent details fetches
+                limits=httpx.Limits(
+                    max_connections=MAX_CONCURRENT_DETAILS + 1,
+                    max_keepalive_connections=MAX_CONCURRENT_DETAILS,
+                ),
+            )
+            self._local.client = client
+            with self._clients_lock:
+                self._clients.append(client)
+        return client
+
+    def close(self):
+        for client in self._clients:
+            try:
+                client.close()
+            except Exception:
+                pass
 
-    @retry(
-        stop=stop_after_attempt(MAX_RETRIES),
-        wait=wait_exponential(multiplier=1, min=2, max=8),
-        retry=retry_if_exception_type((httpx.RequestError, httpx.HTTPStatusError)),
-    )
+    @http_retry
     def load_search_page(self, client: httpx.Client, county_id: str):
         url = f"{BASE_URL}/Sales/SalesSearch?countyId={county_id}"
         r = client.get(url, timeout=HTTP_TIMEOUT)
@@ -368,11 +605,7 @@ class ForeclosureScraper:
             hidden[field] = node.attributes.get("value", "") if node else ""
         return hidden
 
-    @retry(
-        stop=stop_after_attempt(MAX_RETRIES),
-        wait=wait_exponential(multiplier=1, min=2, max=8),
-        retry=retry_if_exception_type((httpx.RequestError, httpx.HTTPStatusError)),
-    )
+    @http_retry
     def post_search(self, client: httpx.Client, county_id: str, hidden: dict):
         url = f"{BASE_URL}/Sales/SalesSearch?countyId={county_id}"
         payload = {
@@ -386,11 +619,7 @@ class ForeclosureScraper:
         r.raise_for_status()
         return HTMLParser(r.text)
 
-    @retry(
-        stop=stop_after_attempt(MAX_RETRIES),
-        wait=wait_exponential(multiplier=1, min=2, max=8),
-        retry=retry_if_exception_type((httpx.RequestError, httpx.HTTPStatusError)),
-    )
+    @http_retry
     def fetch_details(self, client: httpx.Client, property_id: str):
         if not property_id:
             return ""
@@ -408,39 +637,43 @@ class ForeclosureScraper:
                 headers = [norm_text(n.text()) for n in thead_tr.css("th")]
         header_lower = [h.lower() for h in headers]
 
+        # Resolve candidate column indices once per table, not per row
+        addr_idxs = [i for i, h in enumerate(header_lower) if "address" in h]
+        def_idxs = [i for i, h in enumerate(header_lower) if "defendant" in h]
+        date_idxs = [i for i, h in enumerate(header_lower) if "sale" in h and "date" in h]
+
         rows_out = []
         for tr in tree.css("table tbody tr"):
             tds = tr.css("td")
             if not tds:
                 continue
-            cols = [norm_text(td.text()) for td in tds]
             link = tr.css_first("td a")
             href = link.attributes.get("href", "") if link else ""
             pid = extract_property_id_from_href(href)
 
-            address = ""
-            defendant = ""
-            sale_date = ""
-            for i, h in enumerate(header_lower):
-                if "address" in h and i < len(cols) and not address:
-                    address = cols[i]
-                if "defendant" in h and i < len(cols) and not defendant:
-                    defendant = cols[i]
-                if "sale" in h and "date" in h and i < len(cols) and not sale_date:
-                    sale_date = cols[i]
-
             rows_out.append({
                 "Property ID": pid or "",
-                "Address": address,
-                "Defendant": defendant,
-                "Sales Date": sale_date,
+                "Address": self._first_cell_text(tds, addr_idxs),
+                "Defendant": self._first_cell_text(tds, def_idxs),
+                "Sales Date": self._first_cell_text(tds, date_idxs),
                 "County": county["county_name"],
             })
 
         return rows_out
 
+    def _first_cell_text(self, tds, idxs):
+        # First non-empty cell among the candidate columns
+        for i in idxs:
+            if i < len(tds):
+                txt = norm_text(tds[i].text())
+                if txt:
+                    return txt
+        return ""
+
     def scrape_county(self, county):
-        client = httpx.Client(follow_redirects=True, timeout=HTTP_TIMEOUT)
+        client = self._client()
+        # Each ASP.NET search gets a clean session, as with the old per-county client
+        client.cookies.clear()
         try:
             logger.info(f"[INFO] Loading search page for {county['county_name']}")
             tree = self.load_search_page(client, county["county_id"])
@@ -451,17 +684,25 @@ class ForeclosureScraper:
 
             rows = self.extract_rows(results_tree, county)
 
+            def details_for(r):
+                if not r["Property ID"]:
+                    return ""
+                try:
+                    return self.fetch_details(client, r["Property ID"])
+                except Exception as e:
+                    logger.warning(f"Details fetch failed for {county['county_name']} PID={r['Property ID']}: {e}")
+                    return ""
+
+            # Details pages are independent; fetch a few at a time over this county's client
+            with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DETAILS) as pool:
+                details_pages = list(pool.map(details_for, rows))
+
             # Enrich with details
             enriched = []
-            for r in rows:
-                details_html = ""
-                if r["Property ID"]:
-                    try:
-                        details_html = self.fetch_details(client, r["Property ID"])
-                    except Exception as e:
-                        logger.warning(f"Details fetch failed for {county['county_name']} PID={r['Property ID']}: {e}")
-                approx = extract_approx_judgment(details_html, county["county_id"]) if details_html else ""
-                sale_type = extract_sale_type(details_html, county["county_id"]) if details_html else ("Unknown" if county["county_id"] == "24" else "")
+            for r, details_html in zip(rows, details_pages):
+                details_text = HTMLParser(details_html).text() if details_html else ""
+                approx = extract_approx_judgment(details_text, county["county_id"]) if details_html else ""
+                sale_type = extract_sale_type(details_text, county["county_id"]) if details_html else ("Unknown" if county["county_id"] == "24" else "")
                 r["Approx Judgment"] = approx
                 if county["county_id"] == "24":
                     r["Sale Type"] = sale_type
@@ -470,16 +711,33 @@ class ForeclosureScraper:
             logger.info(f"  ✓ {len(enriched)} rows found")
             return enriched
         finally:
-            try:
-                client.close()
-            except:
-                pass
             time.sleep(POLITE_DELAY_SECONDS)
 
 # -----------------------------
 # Orchestration
 # -----------------------------
+def build_existing_pairs(values, county_col_idx: int):
+    # (county, property id) for every data row in the sheet history, in one pass.
+    # "Snapshot for ..." label rows and the header row after each one are skipped.
+    pairs = set()
+    skip_header = False
+    for r in values:
+        if not r:
+            continue
+        first = r[0].strip()
+        if first.lower().startswith("snapshot for"):
+            skip_header = True
+            continue
+        if skip_header:
+            skip_header = False
+            continue
+        cty = r[county_col_idx].strip() if len(r) > county_col_idx else ""
+        if first and cty:
+            pairs.add((sys.intern(cty), sys.intern(first)))
+    return pairs
+
 def run():
+    t0 = time.perf_counter()
     logger.info("Starting foreclosure scraper (httpx lightweight)")
 
     spreadsheet_id = os.environ.get("SPREADSHEET_ID")
@@ -490,7 +748,7 @@ def run():
     try:
         service, sa_email = init_sheets_service_from_env()
     except Exception as e:
-        logger.error(f"Failed to initialize Sheets service: {e}")
+        logger.exception(f"Failed to initialize Sheets service: {e}")
         return
 
     sheets = SheetsClient(spreadsheet_id, service)
@@ -502,24 +760,65 @@ def run():
 
     scraper = ForeclosureScraper()
 
+    def scrape_one(county):
+        county_rows = load_county_checkpoint(county)
+        if county_rows is not None:
+            logger.info(f"Using checkpoint for {county['county_name']} ({len(county_rows)} rows)")
+            return county_rows
+        county_rows = scraper.scrape_county(county)
+        save_county_checkpoint(county, county_rows)
+        return county_rows
+
+    all_sheet = "All Data"
+    summary_sheet = "Summary"
+    county_tabs = [county["county_name"][:30] for county in TARGET_COUNTIES]
+
     all_rows_raw = []
     success_cty = 0
-    for county in TARGET_COUNTIES:
-        try:
-            county_rows = scraper.scrape_county(county)
-            if county_rows:
-                all_rows_raw.extend(county_rows)
-                success_cty += 1
-                logger.info(f"Successfully processed {county['county_name']} with {len(county_rows)} records")
-            else:
-                logger.info(f"No rows for {county['county_name']}")
-        except Exception as e:
-            logger.error(f"Error scraping {county['county_name']}: {e}")
+    # Counties are independent and network-bound; scrape a few at a time
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_COUNTIES) as pool:
+            futures = [pool.submit(scrape_one, county) for county in TARGET_COUNTIES]
+
+            # Sheets work that doesn't depend on the scrape runs here, overlapping with it
+            # (only this thread talks to the Sheets API)
+            try:
+                sheets.create_sheets_if_missing(county_tabs + [all_sheet, summary_sheet])
+                # County tabs only need Property ID..Defendant for the new-row diff. All Data
+                # stays A:Z because its County column is located from the header row.
+                existing_by_tab = sheets.batch_get_values({
+                    **{tab: "A:C" for tab in county_tabs},
+                    all_sheet: "A:Z",
+                })
+            except Exception:
+                # Without the existing values the run can't diff safely; abort, dropping
+                # counties that haven't started scraping yet
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+            # Collect in TARGET_COUNTIES order so sheet output stays deterministic
+            for county, fut in zip(TARGET_COUNTIES, futures):
+                try:
+                    county_rows = fut.result()
+                    if county_rows:
+                        all_rows_raw.extend(county_rows)
+                        success_cty += 1
+                        logger.info(f"Successfully processed {county['county_name']} with {len(county_rows)} records")
+                    else:
+                        logger.info(f"No rows for {county['county_name']}")
+                except Exception as e:
+                    logger.exception(f"Error scraping {county['county_name']}: {e}")
+    finally:
+        scraper.close()
+
+    # One timestamp for the whole run: window start, snapshot rows and Summary
+    run_ts = now_et()
+    label = snapshot_label(run_ts)
 
     # Use only dates (not datetimes) for comparisons
-    start = today_et()
-    end = today_et() + timedelta(days=30)
-    
+    start = run_ts.date()
+    end = start + timedelta(days=30)
+
     def within_30(row):
         dt = parse_sale_date(row.get("Sales Date", ""))
         if not dt:
@@ -545,12 +844,23 @@ def run():
 
     standardized = [normalize(r) for r in filtered]
 
+    # Group once; the per-county sheets and Summary both look rows up by county
+    rows_by_county = defaultdict(list)
+    for r in standardized:
+        rows_by_county[r["County"]].append(r)
+
+    # New-row counts per county, computed once during the diff below and reused by Summary
+    new_counts = {}
+    # tab -> (num columns, payload); snapshots prepended above the history, and tabs
+    # rewritten from scratch. Everything is written in one batch at the end of the run.
+    prepends = {}
+    overwrites = {}
+
     # Per-county sheets
     for county in TARGET_COUNTIES:
         tab = county["county_name"][:30]
-        sheets.create_sheet_if_missing(tab)
-    
-        county_rows = [r for r in standardized if r["County"] == county["county_name"]]
+
+        county_rows = rows_by_county.get(county["county_name"], [])
         if not county_rows:
             logger.info(f"No records for {county['county_name']} within window.")
             continue
@@ -565,14 +875,18 @@ def run():
         cols_with_status = cols + ["Status"]
     
         # --- Get previous snapshot data (excluding first two rows: snapshot + header) ---
-        existing = sheets.get_values(tab, "A:Z")
+        existing = existing_by_tab[tab]
         prev_records = set()
         if existing and len(existing) > 2:
             header_idx = sheets.detect_header_row_index(existing)
-            for r in existing[header_idx + 1:]:
-                if len(r) >= 3:  # ensure Address and Defendant exist
-                    addr = r[cols.index("Address")] if "Address" in cols and len(r) > cols.index("Address") else ""
-                    defn = r[cols.index("Defendant")] if "Defendant" in cols and len(r) > cols.index("Defendant") else ""
+            addr_idx = cols.index("Address")
+            def_idx = cols.index("Defendant")
+            min_len = max(3, addr_idx + 1, def_idx + 1)  # ensure Address and Defendant exist
+            # islice walks the history in place instead of copying it
+            for r in islice(existing, header_idx + 1, None):
+                if len(r) >= min_len:
+                    addr = r[addr_idx]
+                    defn = r[def_idx]
                     if addr and defn:
                         prev_records.add((addr.strip().lower(), defn.strip().lower()))
     
@@ -584,25 +898,26 @@ def run():
             key = (addr.lower(), defn.lower())
             status = "Old" if key in prev_records else "New"
             data_rows.append([row.get(c, "") for c in cols] + [status])
-    
-        # Prepend new snapshot
+        new_counts[county["county_name"]] = sum(1 for r in data_rows if r[-1] == "New")
+
+        # Queue the new snapshot; all county tabs are written in one batch below
         try:
-            sheets.prepend_snapshot(tab, cols_with_status, data_rows)
-            logger.info(f"{county['county_name']}: prepended snapshot with {len(data_rows)} rows (Status marked)")
+            prepends[tab] = (
+                len(cols_with_status),
+                sheets.build_prepend_payload(cols_with_status, data_rows, label),
+            )
+            logger.info(f"{county['county_name']}: prepared snapshot with {len(data_rows)} rows (Status marked)")
         except Exception as e:
-            logger.error(f"Failed to update sheet for {county['county_name']}: {e}")
+            logger.exception(f"Failed to prepare sheet for {county['county_name']}: {e}")
 
-        
     # All Data sheet
-    all_sheet = "All Data"
-    sheets.create_sheet_if_missing(all_sheet)
-
     all_data_rows = [[row.get(c, "") for c in all_cols] for row in standardized]
-    existing = sheets.get_values(all_sheet, "A:Z")
+    export_snapshot_csv(all_cols, all_data_rows, run_ts.date())
+    existing = existing_by_tab[all_sheet]
 
     if not existing or len(existing) <= 1:
-        sheets.overwrite_with_snapshot(all_sheet, all_cols, all_data_rows)
-        logger.info(f"Created 'All Data' with {len(all_data_rows)} rows")
+        overwrites[all_sheet] = (len(all_cols), [[label], all_cols] + all_data_rows)
+        logger.info(f"Prepared full 'All Data' snapshot with {len(all_data_rows)} rows")
     else:
         # Compare (County, Property ID) to detect new rows
         header_idx = sheets.detect_header_row_index(existing)
@@ -615,68 +930,77 @@ def run():
         except Exception:
             pass
 
-        existing_pairs = set()
-        for r in existing[header_idx + 1:]:
-            if not r:
-                continue
-            pid = (r[0] if len(r) > 0 else "").strip()
-            cty = (r[county_col_idx] if len(r) > county_col_idx else "").strip()
-            if pid and cty:
-                existing_pairs.add((cty, pid))
+        existing_pairs = build_existing_pairs(islice(existing, header_idx + 1, None), county_col_idx)
 
+        # Rows are built from all_cols, so every row has the Property ID and County cells
+        cty_idx = all_cols.index("County")
         new_rows = []
         for r in all_data_rows:
-            pid = (r[0] if len(r) > 0 else "").strip()
-            cty = (r[all_cols.index("County")] if len(r) > all_cols.index("County") else "").strip()
-            if pid and cty and (cty, pid) not in existing_pairs:
+            cty = r[cty_idx].strip()
+            pid = r[0].strip()
+            if cty and pid and (cty, pid) not in existing_pairs:
                 new_rows.append(r)
 
-        sheets.prepend_snapshot(all_sheet, all_cols, new_rows)
+        prepends[all_sheet] = (len(all_cols), sheets.build_prepend_payload(all_cols, new_rows, label))
         if new_rows:
-            logger.info(f"Updated 'All Data' with {len(new_rows)} new rows")
+            logger.info(f"Prepared 'All Data' snapshot with {len(new_rows)} new rows")
         else:
-            logger.info("No new rows for 'All Data'. Snapshot row added.")
+            logger.info("No new rows for 'All Data'. Snapshot row will be added.")
         # -----------------------------
     # Summary Sheet
     # -----------------------------
-    summary_sheet = "Summary"
-    sheets.create_sheet_if_missing(summary_sheet)
 
     # Collect summary stats
     summary_rows = [["County", "Total Rows (30-day)", "New Rows Added", "Last Updated"]]
+    updated_at = run_ts.strftime("%Y-%m-%d %H:%M %Z")
     for county in TARGET_COUNTIES:
-        tab = county["county_name"][:30]
-        county_rows = [r for r in standardized if r["County"] == county["county_name"]]
-
-        total_count = len(county_rows)
-
-        # check new rows count (by comparing to existing)
-        existing = sheets.get_values(tab, "A:Z")
-        header_idx = sheets.detect_header_row_index(existing) if existing else 1
-        existing_ids = set()
-        for r in existing[header_idx + 1:]:
-            if not r:
-                continue
-            pid = (r[0] if len(r) > 0 else "").strip()
-            if pid:
-                existing_ids.add(pid)
-        new_count = sum(1 for r in county_rows if r.get("Property ID", "").strip() not in existing_ids)
+        total_count = len(rows_by_county.get(county["county_name"], []))
+        # Re-reading the tab here would see the snapshot we just wrote, so use the diff result
+        new_count = new_counts.get(county["county_name"], 0)
 
         summary_rows.append([
             county["county_name"],
             str(total_count),
             str(new_count),
-            now_et().strftime("%Y-%m-%d %H:%M %Z")
+            updated_at
         ])
 
     # Overwrite summary each run
-    sheets.clear(summary_sheet, "A:Z")
-    sheets.write_values(summary_sheet, summary_rows, "A1")
-    sheets.format_sheet(summary_sheet, len(summary_rows[0]))
+    overwrites[summary_sheet] = (len(summary_rows[0]), summary_rows)
 
-    logger.info(f"Summary sheet updated with {len(TARGET_COUNTIES)} counties")
+    # Write every tab together: one row insert, one values.batchUpdate, one clear.
+    # A failure is re-raised so the run (and the workflow) fails instead of reporting success.
+    inserted = {tab: len(payload) for tab, (_, payload) in prepends.items()}
+    sheets.insert_top_rows(inserted)
+    try:
+        sheets.batch_write_values({tab: payload for tab, (_, payload) in {**prepends, **overwrites}.items()})
+    except Exception as e:
+        logger.exception(f"Failed to write sheets: {e}")
+        # Don't leave the just-inserted rows blank above the history
+        try:
+            sheets.remove_top_rows(inserted)
+        except Exception:
+            logger.exception("Could not remove the inserted rows; blank rows remain at the top of the sheets")
+        raise
+    # Overwritten tabs are cleared only around the new values, after they are written,
+    # so a failed write never leaves them empty
+    tail_ranges = []
+    for tab, (num_cols, payload) in overwrites.items():
+        tail_ranges.append((tab, f"A{len(payload) + 1}:Z"))
+        tail_ranges.append((tab, f"{chr(ord('A') + num_cols)}1:Z{len(payload)}"))
+    sheets.batch_clear(tail_ranges)
+    sheets.format_sheets({
+        **{tab: (num_cols, len(payload) - 2) for tab, (num_cols, payload) in prepends.items()},
+        **{tab: (num_cols, 0) for tab, (num_cols, _) in overwrites.items()},
+    })
+    logger.info(f"Prepended snapshots to {len(prepends)} sheets and rewrote {', '.join(overwrites)}")
+    clear_county_checkpoints()
+
+    # Formatting requests for every tab go out together
+    sheets.flush_pending()
 
     logger.info(f"[SUCCESS] Completed. Processed {success_cty}/{len(TARGET_COUNTIES)} counties with {len(standardized)} rows in window.")
+    logger.info(f"Run took {time.perf_counter() - t0:.1f}s")
 
 if __name__ == "__main__":
     run()